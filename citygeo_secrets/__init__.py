@@ -1,7 +1,9 @@
 import platform
 from .linux_worker import LinuxWorker
 from .windows_worker import WindowsWorker
-from typing import Callable, Any
+from ._trace import Tracer, Span
+from . import _trace
+from typing import Callable, Any, ContextManager
 import keeper_secrets_manager_core as ksm
 
 
@@ -111,3 +113,32 @@ def get_keeper_record(secret_name: str) -> ksm.dto.dtos.Record:
 
     Raise an exception if 0 or more than 1 records match that title'''
     return worker.get_keeper_record(secret_name)
+
+
+def trace(on_start: 'Callable[[Span], None] | None' = None, 
+          on_end: 'Callable[[Span], None] | None' = None) -> ContextManager[Tracer]: 
+    '''Record a timeline of each phase of secret resolution within a `with` block
+        - `on_start`: Optional function called with each `Span` as it starts
+        - `on_end`: Optional function called with each `Span` as it ends
+
+    Usage: 
+        ```
+        with citygeo_secrets.trace() as t: 
+            conn = citygeo_secrets.connect_with_secrets(create_my_conn, 'secret1')
+        print(t.tiers()) # {'secret1': 'cache' | 'mount' | 'keeper'}
+        t.to_json('trace.json')
+        t.to_chrome_trace('trace_chrome.json') # Open in chrome://tracing
+        ```
+
+    Phases recorded: "mount_probe", "build_mount", "resolve" (one per secret, 
+    including the tier that served it), "mount_read", "mount_write", 
+    "secrets_manager_setup", "keeper_fetch", "parse_record", and "connect". 
+
+    The mount probe run when `citygeo_secrets` is imported is always included as a 
+    "mount_probe" span with `at_import=True` and a negative start time, since no 
+    trace can be active then. Later "mount_probe" spans follow a mount build. 
+    
+    Only phases run in the calling thread are recorded; each thread may have its 
+    own `trace()` block. Tracing has near-zero overhead outside of a `trace()` block'''
+    return _trace.trace(on_start=on_start, on_end=on_end, logger=worker.logger, 
+                        earlier_spans=[worker._import_mount_probe])
@@ -1,5 +1,6 @@
 import os
 import keeper_secrets_manager_core as ksm
+from ._trace import span
 
 # This module is meant to be imported by AbstractWorker
 # Using this module directly will fail. 
@@ -48,17 +49,18 @@ def _parse_keeper_record(self, record: ksm.dto.dtos.Record) -> dict:
     
     Raise `AssertionError` if any field has multiple values'''
     secret_dict = {}
-    for section in ['fields', 'custom']: 
-        for field in record.dict[section]: 
-            try: 
-                field_name = field['label']
-            except KeyError: 
-                field_name = field['type']
-            field_value = field['value']
+    with span('parse_record', record.title): 
+        for section in ['fields', 'custom']: 
+            for field in record.dict[section]: 
+                try: 
+                    field_name = field['label']
+                except KeyError: 
+                    field_name = field['type']
+                field_value = field['value']
 
-            if field_value != []: 
-                assert len(field_value) == 1, f'Multiple values appear for secret record"{record.title}" {section} {field_name}.\nParse manually with citygeo_secrets.keeper.get_record(secret_name)'
-                secret_dict[field_name] = field_value[0]
+                if field_value != []: 
+                    assert len(field_value) == 1, f'Multiple values appear for secret record"{record.title}" {section} {field_name}.\nParse manually with citygeo_secrets.keeper.get_record(secret_name)'
+                    secret_dict[field_name] = field_value[0]
                 
     return secret_dict
 
@@ -67,8 +69,10 @@ def get_keeper_record(self, secret_name: str) -> ksm.dto.dtos.Record:
     '''Return the record with this name from a Keeper Secrets Manager
     
     Raise an exception if 0 or more than 1 records match that title'''
-    secrets_manager = self._get_keeper_secret_manager()
-    record = secrets_manager.get_secrets_by_title(secret_name)
+    with span('secrets_manager_setup', secret_name): 
+        secrets_manager = self._get_keeper_secret_manager()
+    with span('keeper_fetch', secret_name): 
+        record = secrets_manager.get_secrets_by_title(secret_name)
     assert len(record) != 0, f'Secret record "{secret_name}" was not found by this application.'
     assert len(record) == 1, f'"{secret_name}" belongs to {len(record)} records. Change record names.'
     self.logger.info(f'Successfully retrieved secret record "{secret_name}" from keeper')
@@ -0,0 +1,201 @@
+import os, json, time, logging, threading, contextlib
+from typing import Callable, Sequence
+
+# This module records a timeline of how secrets were resolved. Workers wrap
+# each phase in `with span(...)`; when no trace is active `span` returns a
+# shared no-op object, so tracing costs a single attribute lookup when off.
+
+# The active tracer is per-thread so that overlapping `trace()` blocks in
+# different threads neither steal each other's spans nor leak a tracer
+_local = threading.local()
+
+
+class Span:
+    '''One timed phase of secret resolution
+        - `name`: Phase, e.g. "mount_probe", "build_mount", "secrets_manager_setup",
+        "keeper_fetch", "parse_record", "mount_read", "mount_write", "resolve", "connect"
+        - `secret_name`: Secret being resolved, if the phase relates to a single secret
+        - `tier`: For "resolve" spans, one of "cache", "mount", "keeper"
+        - `start`, `end`: `time.perf_counter()` values in seconds
+    '''
+    __slots__ = ('name', 'secret_name', 'tier', 'attrs', 'start', 'end',
+                 'pid', 'thread_id', '_tracer')
+
+    def __init__(self, tracer: 'Tracer', name: str, secret_name: 'str | None', attrs: dict):
+        self._tracer = tracer
+        self.name = name
+        self.secret_name = secret_name
+        self.tier = None
+        self.attrs = attrs
+        self.start = None
+        self.end = None
+        self.pid = os.getpid()
+        self.thread_id = threading.get_ident()
+
+    @property
+    def duration(self) -> 'float | None':
+        '''Duration in seconds, or None if the span has not finished'''
+        if self.start is None or self.end is None:
+            return None
+        return self.end - self.start
+
+    def set(self, tier: 'str | None' = None, **attrs):
+        '''Record the tier that served a secret and/or extra attributes'''
+        if tier is not None:
+            self.tier = tier
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> 'Span':
+        self._tracer._start(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self._tracer._end(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'secret_name': self.secret_name,
+            'tier': self.tier,
+            'start': self.start - self._tracer.start,
+            'duration': self.duration,
+            'pid': self.pid,
+            'thread_id': self.thread_id,
+            'attrs': self.attrs,
+        }
+
+
+class _NullSpan:
+    '''Returned by `span` when tracing is off'''
+    __slots__ = ()
+
+    def set(self, tier: 'str | None' = None, **attrs):
+        pass
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    '''Collects the spans recorded inside a `citygeo_secrets.trace()` block.
+    Exceptions raised by the hooks are logged as warnings to `logger`.
+
+    `earlier_spans` are phases that finished before the block opened, as 
+    dictionaries with keys "name", "start", "end", "thread_id", and "attrs". They 
+    are included with a negative start time and are not passed to the hooks'''
+    def __init__(self, on_start: 'Callable[[Span], None] | None' = None,
+                 on_end: 'Callable[[Span], None] | None' = None,
+                 logger: 'logging.Logger | None' = None,
+                 earlier_spans: 'Sequence[dict]' = ()):
+        self.on_start = on_start
+        self.on_end = on_end
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.spans = []
+        for earlier in earlier_spans:
+            s = Span(self, earlier['name'], None, dict(earlier['attrs']))
+            s.start, s.end, s.thread_id = earlier['start'], earlier['end'], earlier['thread_id']
+            self.spans.append(s)
+        self.start = time.perf_counter()
+        self.end = None
+
+    def _start(self, span: Span):
+        span.start = time.perf_counter()
+        if self.on_start is not None:
+            self._call_hook(self.on_start, span)
+
+    def _end(self, span: Span):
+        span.end = time.perf_counter()
+        self.spans.append(span) # Only the thread that opened the trace() block records here
+        if self.on_end is not None:
+            self._call_hook(self.on_end, span)
+
+    def _call_hook(self, hook: 'Callable[[Span], None]', span: Span):
+        '''Call a user hook, logging rather than raising any exception so that
+        tracing never changes whether a secret resolves'''
+        try:
+            hook(span)
+        except Exception as e:
+            self.logger.warning(f'Trace hook {hook!r} raised {type(e).__name__} for span "{span.name}": {e}')
+
+    def tiers(self) -> 'dict[str, str]':
+        '''Return `{secret_name: tier}` for the most recent resolution of each secret'''
+        return {s.secret_name: s.tier for s in sorted(self.spans, key=lambda s: s.start)
+                if s.name == 'resolve' and s.tier is not None}
+
+    def to_dict(self) -> dict:
+        '''Return the timeline as a dictionary, with spans ordered by start time
+        and times in seconds relative to the start of the trace'''
+        return {
+            'duration': (self.end or time.perf_counter()) - self.start,
+            'tiers': self.tiers(),
+            'spans': [s.to_dict() for s in sorted(self.spans, key=lambda s: s.start)],
+        }
+
+    def to_json(self, path: 'str | None' = None, **kwargs) -> str:
+        '''Return the timeline as a JSON string, also writing it to `path` if given.
+        `kwargs` are passed to `json.dumps`'''
+        return self._dump(self.to_dict(), path, **kwargs)
+
+    def to_chrome_trace(self, path: 'str | None' = None, **kwargs) -> str:
+        '''Return the timeline in Chrome trace event format as a JSON string, also
+        writing it to `path` if given. Open the file in chrome://tracing or
+        https://ui.perfetto.dev. `kwargs` are passed to `json.dumps`'''
+        events = []
+        for s in sorted(self.spans, key=lambda s: s.start):
+            args = dict(s.attrs)
+            if s.secret_name is not None:
+                args['secret_name'] = s.secret_name
+            if s.tier is not None:
+                args['tier'] = s.tier
+            events.append({
+                'name': s.name if s.secret_name is None else f'{s.name}: {s.secret_name}',
+                'cat': 'citygeo_secrets',
+                'ph': 'X',
+                'ts': (s.start - self.start) * 1e6,
+                'dur': s.duration * 1e6,
+                'pid': s.pid,
+                'tid': s.thread_id,
+                'args': args,
+            })
+        return self._dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, path, **kwargs)
+
+    @staticmethod
+    def _dump(obj: dict, path: 'str | None', **kwargs) -> str:
+        rv = json.dumps(obj, **kwargs)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(rv)
+        return rv
+
+
+@contextlib.contextmanager
+def trace(on_start: 'Callable[[Span], None] | None' = None,
+          on_end: 'Callable[[Span], None] | None' = None,
+          logger: 'logging.Logger | None' = None, earlier_spans: 'Sequence[dict]' = ()):
+    '''Record a timeline of secret resolution in the current thread for the
+    duration of the block. Nested blocks record to the innermost tracer only'''
+    tracer = Tracer(on_start=on_start, on_end=on_end, logger=logger, earlier_spans=earlier_spans)
+    previous = getattr(_local, 'tracer', None)
+    _local.tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _local.tracer = previous
+        tracer.end = time.perf_counter()
+
+
+def span(name: str, secret_name: 'str | None' = None, **attrs) -> 'Span | _NullSpan':
+    '''Return a context manager timing phase `name`; a no-op when tracing is off'''
+    tracer = getattr(_local, 'tracer', None)
+    if tracer is None:
+        return _NULL_SPAN
+    return Span(tracer, name, secret_name, attrs)
@@ -1,7 +1,8 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
 from typing import Callable, Any
-import os, json, pprint, logging, getpass, platform
+import os, json, time, pprint, logging, getpass, platform, threading
+from ._trace import span
 
 class AbstractWorker(ABC): 
     '''Abstract base class to ensure worker classes are properly implemented
@@ -28,6 +29,10 @@ class AbstractWorker(ABC):
         self._cache = {}
         self.platform = platform.system()
         self.reset_mount_attributes()
+        # No trace() block can be active while the module is imported, so keep 
+        # the first probe to add to every trace
+        self._import_mount_probe = dict(self._last_mount_probe, attrs=dict(
+            self._last_mount_probe['attrs'], at_import=True))
 
     def set_config(self, **kwargs): 
         '''Set the configuration options regardless of worker subclass'''
@@ -45,16 +50,22 @@ class AbstractWorker(ABC):
     
     def reset_mount_attributes(self): 
         '''Set or reset attributes for the worker related to mount existence and access'''
-        self.mount_exists = self.determine_mount_exists()
+        start = time.perf_counter()
+        with span('mount_probe') as s:
+            self.mount_exists = self.determine_mount_exists()
+            self.mount_access = self.mount_exists and self.determine_mount_access()
+            s.set(mount_exists=self.mount_exists, mount_access=self.mount_access)
+        self._last_mount_probe = {
+            'name': 'mount_probe', 'start': start, 'end': time.perf_counter(), 
+            'thread_id': threading.get_ident(), 
+            'attrs': {'mount_exists': self.mount_exists, 'mount_access': self.mount_access}}
         if self.mount_exists:
             self.logger.info(f'Mounted drive located at {self.MOUNT_LOCATION}')
-            self.mount_access = self.determine_mount_access()
             if self.mount_access: 
                 self.logger.info(f'User "{getpass.getuser()}" has permission to access mounted drive')
             else: 
                 self.logger.info(f'User "{getpass.getuser()}" does not have permission to access mounted drive')
         else:
-            self.mount_access = False
             self.logger.info(f'Mounted drive does not exist')
     
     def determine_write(self, secret_name: str, secret: dict, write_cache: bool, write_mount: bool):
@@ -64,35 +75,41 @@ class AbstractWorker(ABC):
             self.logger.debug(f'Successfully wrote secret "{secret_name}" to cache')
         if write_mount:
             secret_path = self._generate_secret_path(secret_name)
-            self._write_secret_to_mount(secret_path, secret)
+            with span('mount_write', secret_name):
+                self._write_secret_to_mount(secret_path, secret)
     
     def _generate_secrets_dict(self, *secret_names: str, drive_access: bool, search_cache: bool) -> 'dict':
         secrets_dict = {}
         for secret_name in secret_names:
-            if search_cache:
-                secret = self._cache.get(secret_name, None)
-                if secret != None:  # Secret found in cache
-                    secrets_dict[secret_name] = self._cache[secret_name]
-                    self.logger.info(
-                        f'Successfully retrieved secret "{secret_name}" from cache')
-                    continue
-            if drive_access:
-                secret_path = self._generate_secret_path(secret_name)
-                secret = self._get_secret_from_mount(secret_path)
-                if secret != None:  # Secret found in mount
-                    secrets_dict[secret_name] = secret
-                    self.logger.info(
-                        f'Successfully retrieved secret "{secret_name}" from mounted drive')
-                    self.determine_write(secret_name, secret,
-                                         write_cache=True, write_mount=False)
-                    continue
+            with span('resolve', secret_name) as s:
+                if search_cache:
+                    secret = self._cache.get(secret_name, None)
+                    if secret != None:  # Secret found in cache
+                        secrets_dict[secret_name] = self._cache[secret_name]
+                        self.logger.info(
+                            f'Successfully retrieved secret "{secret_name}" from cache')
+                        s.set(tier='cache')
+                        continue
+                if drive_access:
+                    secret_path = self._generate_secret_path(secret_name)
+                    with span('mount_read', secret_name):
+                        secret = self._get_secret_from_mount(secret_path)
+                    if secret != None:  # Secret found in mount
+                        secrets_dict[secret_name] = secret
+                        self.logger.info(
+                            f'Successfully retrieved secret "{secret_name}" from mounted drive')
+                        self.determine_write(secret_name, secret,
+                                             write_cache=True, write_mount=False)
+                        s.set(tier='mount')
+                        continue
 
-            # If not found or not searching in cache & mount, use Keeper
-            record = self.get_keeper_record(secret_name)
-            secret = self._parse_keeper_record(record)
-            secrets_dict[secret_name] = secret
-            self.determine_write(secret_name, secret,
-                                 write_cache=True, write_mount=drive_access)
+                # If not found or not searching in cache & mount, use Keeper
+                record = self.get_keeper_record(secret_name)
+                secret = self._parse_keeper_record(record)
+                secrets_dict[secret_name] = secret
+                self.determine_write(secret_name, secret,
+                                     write_cache=True, write_mount=drive_access)
+                s.set(tier='keeper')
 
         return secrets_dict
 
@@ -103,7 +120,8 @@ class AbstractWorker(ABC):
                 return self._generate_secrets_dict(
                     *secret_names, drive_access=self.mount_access, search_cache=search_cache)
             else:
-                self._build_mount()
+                with span('build_mount'):
+                    self._build_mount()
                 self.reset_mount_attributes()
                 if self.mount_exists and self.mount_access: 
                     return self._generate_secrets_dict(
@@ -115,15 +133,19 @@ class AbstractWorker(ABC):
     def connect_with_secrets(self, func: Callable[[dict], Any], *secret_names: str, **kwargs):
         secrets = self.get_secrets(*secret_names)
         try:
-            return func(secrets, **kwargs)
+            with span('connect', attempt=1):
+                return func(secrets, **kwargs)
         except Exception as e:
             if self.mount_exists and self.mount_access:
                 secrets_dict = {}
                 for secret_name in secret_names:
-                    record = self.get_keeper_record(secret_name)
-                    secret = self._parse_keeper_record(record)
-                    secrets_dict[secret_name] = secret
-                conn = func(secrets_dict, **kwargs)
+                    with span('resolve', secret_name) as s:
+                        record = self.get_keeper_record(secret_name)
+                        secret = self._parse_keeper_record(record)
+                        secrets_dict[secret_name] = secret
+                        s.set(tier='keeper')
+                with span('connect', attempt=2):
+                    conn = func(secrets_dict, **kwargs)
                 for secret_name, secret in secrets_dict.items():  # Only write if 2nd attempt doesn't raise an exception
                     self.determine_write(secret_name, secret, write_cache=True, write_mount=True)
                 return conn
@@ -0,0 +1,359 @@
+'''
+Thundering-herd load simulator for this package.
+
+Spawns many processes (each with many threads) that all call `get_secrets` and
+`connect_with_secrets` at the same moment against a local fake Keeper
+SecretsManager and a temporary "mounted" drive. No Keeper account, sudo, or
+tmpfs is required.
+
+Each scenario is named "<mount>-<access>-<cache>":
+* mount: "absent" (the first `get_secrets` call builds it), "present" (empty),
+or "seeded" (present and already holding every secret, e.g. written by an
+earlier run or by another user)
+* access: "access" or "noaccess", whether the user can access (or build) the
+mounted drive
+* cache: "cold" or "warm", whether each process's in-memory cache already holds
+every secret before the burst
+
+All 8 combinations of absent/present, access/noaccess and cold/warm are run,
+plus "seeded" with a cold in-memory cache. "seeded" with a warm in-memory cache
+is left out because a warm cache is served before the mounted drive is read,
+so it behaves exactly like "present" with a warm cache.
+
+For each scenario it reports:
+* Keeper calls, and amplification (Keeper calls / number of distinct secrets)
+* p50/p99 latency of each call
+* JSON decode errors caused by racing writes to the mounted drive
+
+Usage:
+    python load_test.py --processes 16 --threads 4 --secrets 3
+    python load_test.py --scenario present-access-cold --json results.json
+'''
+
+import argparse, itertools, json, logging, math, multiprocessing, os, queue, random, shutil, sys, tempfile, threading, time, traceback
+
+# Importing the package builds the real platform worker singleton, which probes
+# the real mounted drive and logs the result before --log-level can be applied.
+# Silence that probe here (this also runs in each child process on platforms
+# that spawn rather than fork).
+logging.disable(logging.INFO)
+from citygeo_secrets.abstract_worker import AbstractWorker
+logging.disable(logging.NOTSET)
+
+
+SCENARIOS = {
+    f'{mount}-{access}-{cache}': dict(
+        mount=mount, mount_access=access == 'access', cache_warm=cache == 'warm')
+    for mount, access, cache in itertools.product(
+        ('absent', 'present', 'seeded'), ('noaccess', 'access'), ('cold', 'warm'))
+    if not (mount == 'seeded' and cache == 'warm')
+}
+
+
+class FakeRecord:
+    '''Mimics the parts of `keeper_secrets_manager_core.dto.dtos.Record` used by
+    `_parse_keeper_record`'''
+    def __init__(self, title: str):
+        self.title = title
+        self.dict = {
+            'fields': [
+                {'type': 'login', 'value': [f'{title}-login']},
+                {'type': 'password', 'value': [f'{title}-password']}],
+            'custom': [
+                {'type': 'text', 'label': 'padding', 'value': ['x' * 512]}]
+        }
+
+
+class FakeSecretsManager:
+    '''Mimics `keeper_secrets_manager_core.SecretsManager`, sleeping for
+    `latency` seconds per call and counting every call'''
+    def __init__(self, latency: float, counter: 'dict[str, int]', lock: threading.Lock):
+        self.latency = latency
+        self.counter = counter
+        self.lock = lock
+
+    def get_secrets_by_title(self, title: str) -> 'list[FakeRecord]':
+        with self.lock:
+            self.counter['keeper_calls'] += 1
+        time.sleep(self.latency)
+        return [FakeRecord(title)]
+
+
+class LoadTestWorker(AbstractWorker):
+    '''Worker that uses a temporary directory as its "mounted" drive and a
+    FakeSecretsManager instead of Keeper'''
+    def __init__(self, mount_location: str, mount_access: bool,
+                 keeper_latency: float, build_latency: float):
+        self.MOUNT_LOCATION = mount_location
+        self._mount_access = mount_access
+        self._keeper_latency = keeper_latency
+        self._build_latency = build_latency
+        self._lock = threading.Lock()
+        self.counter = {'keeper_calls': 0, 'secrets_manager_setups': 0, 'mount_builds': 0}
+
+        super().__init__()
+
+    def determine_mount_exists(self) -> bool:
+        return os.path.isdir(self.MOUNT_LOCATION)
+
+    def determine_mount_access(self) -> bool:
+        return self._mount_access
+
+    def generate_env_file(self, method: str = 'keeper', **kwargs: 'tuple[str, str | list[str]]'):
+        raise NotImplementedError
+
+    def _generate_secret_path(self, secret_name: str) -> str:
+        storage_name = secret_name.replace('/', '_')
+        return os.path.join(self.MOUNT_LOCATION, f'{storage_name}.json')
+
+    def _build_mount(self):
+        '''Simulate tmpfs-mount.sh: succeed if the user has access, otherwise
+        behave like a permission error and fall back to Keeper'''
+        with self._lock:
+            self.counter['mount_builds'] += 1
+        time.sleep(self._build_latency)
+        if self._mount_access:
+            os.makedirs(self.MOUNT_LOCATION, exist_ok=True)
+
+    def _get_keeper_secret_manager(self) -> FakeSecretsManager:
+        with self._lock:
+            self.counter['secrets_manager_setups'] += 1
+        return FakeSecretsManager(self._keeper_latency, self.counter, self._lock)
+
+
+def _percentile(values: 'list[float]', pct: float) -> 'float | None':
+    '''Nearest-rank percentile'''
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _run_process(process_num: int, scenario: dict, args: argparse.Namespace,
+                 secret_names: 'list[str]', mount_location: str,
+                 barrier: 'multiprocessing.synchronize.Barrier',
+                 results: 'multiprocessing.Queue'):
+    '''Body of each simulated process: one worker shared by `args.threads` threads,
+    mirroring the module-level `citygeo_secrets.worker` singleton.
+
+    Puts a dictionary of statistics on `results`, or `{'error': <message>}` if the
+    process could not run its share of the load'''
+    try:
+        AbstractWorker.logger.setLevel(args.log_level.upper())
+        worker = LoadTestWorker(
+            mount_location, scenario['mount_access'],
+            keeper_latency=args.keeper_latency / 1000, build_latency=args.build_latency / 1000)
+    except Exception:
+        barrier.abort()  # Release every other process rather than leaving them waiting
+        results.put({'error': f'Process {process_num} failed to start:\n{traceback.format_exc()}'})
+        return
+    if scenario['cache_warm']:
+        for secret_name in secret_names:
+            secret = worker._parse_keeper_record(FakeRecord(secret_name))
+            worker.determine_write(secret_name, secret, write_cache=True, write_mount=False)
+    stats = {'latencies': [], 'decode_errors': 0, 'connect_errors': 0, 'other_errors': 0, 'calls': 0}
+    stats_lock = threading.Lock()
+    thread_errors = []
+
+    def run_thread(thread_num: int):
+        # One RNG per thread so that --seed makes runs reproducible regardless of scheduling
+        rng = random.Random(f'{args.seed}-{process_num}-{thread_num}')
+
+        def connect(creds: dict) -> dict:
+            if rng.random() < args.fail_rate:
+                raise ConnectionError('Simulated stale credentials')
+            return creds
+
+        try:
+            barrier.wait(timeout=args.timeout)
+        except threading.BrokenBarrierError:
+            thread_errors.append(
+                f'Process {process_num} thread {thread_num} gave up waiting for the other processes to start')
+            return
+        for i in range(args.calls):
+            if args.mode == 'get' or (args.mode == 'mixed' and i % 2 == 0):
+                call = lambda: worker.get_secrets(*secret_names)
+            else:
+                call = lambda: worker.connect_with_secrets(connect, *secret_names)
+            start = time.perf_counter()
+            try:
+                call()
+            except json.decoder.JSONDecodeError:
+                with stats_lock:
+                    stats['decode_errors'] += 1
+            except ConnectionError:  # Simulated failure that the retry did not recover from
+                with stats_lock:
+                    stats['connect_errors'] += 1
+            except Exception:
+                with stats_lock:
+                    stats['other_errors'] += 1
+            elapsed = time.perf_counter() - start
+            with stats_lock:
+                stats['latencies'].append(elapsed)
+                stats['calls'] += 1
+
+    threads = [threading.Thread(target=run_thread, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if thread_errors:
+        results.put({'error': '\n'.join(thread_errors)})
+        return
+    stats.update(worker.counter)
+    results.put(stats)
+
+
+def _collect_results(name: str, processes: 'list[multiprocessing.Process]',
+                     results: 'multiprocessing.Queue', deadline: float) -> 'list[dict]':
+    '''Gather one result per process, raising `RuntimeError` naming the scenario
+    if a process reports an error, dies without reporting, or `deadline` passes'''
+    per_process = []
+    while len(per_process) < len(processes):
+        try:
+            result = results.get(timeout=1)
+        except queue.Empty:
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f'Scenario "{name}": timed out waiting for processes')
+            # A process that died without reporting will never put a result
+            dead = [p.exitcode for p in processes if p.exitcode not in (None, 0)]
+            if dead:
+                raise RuntimeError(f'Scenario "{name}": processes exited with codes {dead}')
+            continue
+        if 'error' in result:
+            raise RuntimeError(f'Scenario "{name}": {result["error"]}')
+        per_process.append(result)
+    return per_process
+
+
+def run_scenario(name: str, args: argparse.Namespace) -> dict:
+    '''Run one scenario and return its aggregated statistics'''
+    scenario = SCENARIOS[name]
+    secret_names = [f'load-test/secret-{i}' for i in range(args.secrets)]
+    tmp_dir = tempfile.mkdtemp(prefix='citygeo_secrets_load_test_')
+    mount_location = os.path.join(tmp_dir, 'tmpfs-secure')
+    try:
+        if scenario['mount'] != 'absent':
+            os.makedirs(mount_location)
+        if scenario['mount'] == 'seeded':
+            seeder = LoadTestWorker(mount_location, True, 0, 0)
+            for secret_name in secret_names:
+                secret = seeder._parse_keeper_record(FakeRecord(secret_name))
+                seeder._write_secret_to_mount(seeder._generate_secret_path(secret_name), secret)
+
+        ctx = multiprocessing.get_context()
+        barrier = ctx.Barrier(args.processes * args.threads)
+        results = ctx.Queue()
+        processes = [
+            ctx.Process(target=_run_process, args=(
+                n, scenario, args, secret_names, mount_location, barrier, results))
+            for n in range(args.processes)]
+        start = time.perf_counter()
+        for p in processes:
+            p.start()
+        try:
+            per_process = _collect_results(name, processes, results, start + args.timeout)
+        finally:
+            for p in processes:
+                p.join(timeout=1)
+                if p.is_alive():
+                    p.terminate()
+                    p.join()
+        wall_time = time.perf_counter() - start
+        crashed = [p.exitcode for p in processes if p.exitcode != 0]
+        if crashed:
+            raise RuntimeError(f'Scenario "{name}": processes exited with codes {crashed}')
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    latencies = list(itertools.chain.from_iterable(s['latencies'] for s in per_process))
+    keeper_calls = sum(s['keeper_calls'] for s in per_process)
+    p50, p99 = _percentile(latencies, 50), _percentile(latencies, 99)
+    return {
+        'scenario': name,
+        'processes': args.processes,
+        'threads': args.threads,
+        'secrets': args.secrets,
+        'calls': sum(s['calls'] for s in per_process),
+        'keeper_calls': keeper_calls,
+        'amplification': keeper_calls / len(secret_names),
+        'secrets_manager_setups': sum(s['secrets_manager_setups'] for s in per_process),
+        'mount_builds': sum(s['mount_builds'] for s in per_process),
+        'p50_ms': None if p50 is None else p50 * 1000,
+        'p99_ms': None if p99 is None else p99 * 1000,
+        'decode_errors': sum(s['decode_errors'] for s in per_process),
+        'connect_errors': sum(s['connect_errors'] for s in per_process),
+        'other_errors': sum(s['other_errors'] for s in per_process),
+        'wall_time_s': wall_time,
+    }
+
+
+def print_results(rows: 'list[dict]'):
+    columns = [
+        ('scenario', 'scenario', '{:<22}'),
+        ('calls', 'calls', '{:>7}'),
+        ('keeper', 'keeper_calls', '{:>7}'),
+        ('amplif.', 'amplification', '{:>8.1f}'),
+        ('builds', 'mount_builds', '{:>7}'),
+        ('p50 ms', 'p50_ms', '{:>8.2f}'),
+        ('p99 ms', 'p99_ms', '{:>8.2f}'),
+        ('decode', 'decode_errors', '{:>7}'),
+        ('connect', 'connect_errors', '{:>8}'),
+        ('other', 'other_errors', '{:>6}'),
+    ]
+    header = ' '.join(fmt.replace('.1f', '').replace('.2f', '').format(title)
+                      for title, _, fmt in columns)
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(' '.join(fmt.format(row[key]) for _, key, fmt in columns))
+
+
+def positive_int(value: str) -> int:
+    '''argparse type for integers >= 1'''
+    rv = int(value)
+    if rv < 1:
+        raise argparse.ArgumentTypeError(f'{value} is not a positive integer')
+    return rv
+
+
+def parse_args(argv: 'list[str] | None' = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Simulate a burst of simultaneous processes resolving secrets')
+    parser.add_argument('--processes', type=positive_int, default=8, help='Number of processes (default: %(default)s)')
+    parser.add_argument('--threads', type=positive_int, default=4, help='Threads per process (default: %(default)s)')
+    parser.add_argument('--calls', type=positive_int, default=5, help='Calls per thread (default: %(default)s)')
+    parser.add_argument('--secrets', type=positive_int, default=3, help='Distinct secrets requested per call (default: %(default)s)')
+    parser.add_argument('--mode', choices=['get', 'connect', 'mixed'], default='mixed',
+                        help='Call get_secrets, connect_with_secrets, or alternate (default: %(default)s)')
+    parser.add_argument('--fail-rate', type=float, default=0.1,
+                        help='Probability the connection function raises, forcing a retry (default: %(default)s)')
+    parser.add_argument('--keeper-latency', type=float, default=50, help='Fake Keeper latency in ms (default: %(default)s)')
+    parser.add_argument('--build-latency', type=float, default=100, help='Fake mount build latency in ms (default: %(default)s)')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help='Scenario to run, may be repeated (default: all)')
+    parser.add_argument('--timeout', type=float, default=300,
+                        help='Seconds before a scenario is considered hung and fails (default: %(default)s)')
+    parser.add_argument('--log-level', default='error', help='Log level for the workers (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: %(default)s)')
+    parser.add_argument('--json', metavar='PATH', help='Also write results as JSON to PATH')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    AbstractWorker.logger.setLevel(args.log_level.upper())
+    rows, failed = [], []
+    for name in (args.scenario or SCENARIOS):
+        try:
+            rows.append(run_scenario(name, args))
+        except RuntimeError as e:
+            print(f'FAILED: {e}', file=sys.stderr)
+            failed.append(name)
+    print_results(rows)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=4)
+    if failed:
+        sys.exit(f'{len(failed)} scenario(s) failed: {", ".join(failed)}')
@@ -5,7 +5,7 @@ time can turn this into a better set of tests suitable for `pytest`.
 
 import citygeo_secrets as cgs
 import sqlalchemy as sa
-import random, logging
+import random, logging, threading, time, json
 
 def create_engine(creds: dict, host_secret: str, schema_secret: str) -> sa.Engine:
     '''Compose the URL object, create engine, and test connection'''
@@ -157,3 +157,56 @@ try:
                             'port'))
 except NotImplementedError: 
     print('NotImplementedError successfully raised')
+
+print()
+
+# Test
+print_test()
+with cgs.trace() as t: 
+    cgs.get_secrets('Test CityGeo_Secrets', build=False, search_cache=False)
+assert t.tiers() == {'Test CityGeo_Secrets': 'keeper'}, t.tiers()
+with cgs.trace() as t: 
+    cgs.get_secrets('Test CityGeo_Secrets', build=False)
+    cgs.connect_with_secrets(lambda creds: creds, 'Test CityGeo_Secrets')
+assert t.tiers() == {'Test CityGeo_Secrets': 'cache'}, t.tiers()
+with cgs.trace() as t: 
+    cgs.get_secrets('Test CityGeo_Secrets', build=False, search_cache=False)
+    cgs.connect_with_secrets(lambda creds: creds, 'Test CityGeo_Secrets')
+event_names = {e['name'].split(': ')[0] for e in json.loads(t.to_chrome_trace())['traceEvents']}
+assert {'resolve', 'keeper_fetch', 'connect'} <= event_names, event_names
+assert any(s.name == 'mount_probe' and s.attrs.get('at_import') for s in t.spans)
+print(f"\t{t.to_json()}")
+print()
+
+# Test
+print_test()
+# Overlapping trace() blocks in different threads record only their own spans
+# and leave tracing off afterwards
+tracers = {}
+def trace_in_thread(i): 
+    with cgs.trace() as tt: 
+        time.sleep(0.05 * i)
+        cgs.get_secrets('Test CityGeo_Secrets', build=False, search_cache=False)
+    tracers[i] = (tt, threading.get_ident())
+threads = [threading.Thread(target=trace_in_thread, args=(i,)) for i in (1, 2)]
+for th in threads: 
+    th.start()
+for th in threads: 
+    th.join()
+for tt, thread_id in tracers.values(): 
+    own_spans = [s for s in tt.spans if not s.attrs.get('at_import')]
+    assert len(own_spans) > 0
+    assert all(s.thread_id == thread_id for s in own_spans)
+assert getattr(cgs._trace._local, 'tracer', None) is None
+print('\tOverlapping trace blocks successfully isolated')
+print()
+
+# Test
+print_test()
+from load_test import _percentile
+assert _percentile([], 50) is None
+assert _percentile([5, 1, 4, 2, 3], 50) == 3
+assert _percentile(list(range(1, 151)), 99) == 149
+assert _percentile(list(range(1, 101)), 99) == 99
+assert _percentile([1, 2], 0) == 1 and _percentile([1, 2], 100) == 2
+print('\tload_test._percentile returns nearest-rank percentiles')